@@ -9,17 +9,26 @@ License: MIT
 Version: 2.0.0
 """
 
+import argparse
 import asyncio
+import csv
+import itertools
 import json
+import math
 import os
+import re
 import sys
 import logging
-from typing import Any, Dict, List, Optional
+import tempfile
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
 from datetime import datetime
 
 # vertex-ai-imagen 패키지
 try:
-    from vertex_ai_imagen import ImagenClient
+    from vertex_ai_imagen import ImagenClient, GeneratedImage
 except ImportError:
     # MCP 모드에서는 조용히 종료
     if not sys.stdin.isatty():
@@ -39,6 +48,647 @@ logger = logging.getLogger(__name__)
 # 전역 클라이언트
 imagen_client = None
 
+# 요청 우선순위 클래스 (앞에 있을수록 먼저 처리)
+PRIORITY_CLASSES = ("interactive", "batch")
+DEFAULT_PRIORITY = "interactive"
+
+def _env_int(name: str, default: int) -> int:
+    """정수 환경변수 읽기 (잘못된 값이면 기본값)"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    """실수 환경변수 읽기 (잘못된 값이면 기본값)"""
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    """'client=2,other=1' 형식의 클라이언트 가중치 파싱"""
+    weights = {}
+    for item in value.split(","):
+        name, sep, weight = item.partition("=")
+        if not sep:
+            continue
+        try:
+            weights[name.strip()] = max(float(weight), 0.1)
+        except ValueError:
+            continue
+    return weights
+
+class OverloadedError(Exception):
+    """서버 과부하로 요청을 즉시 거부할 때 발생"""
+    pass
+
+class FairScheduler:
+    """우선순위 클래스 + 클라이언트별 공정 큐 (Deficit Round Robin)
+
+    - 우선순위가 높은 클래스의 대기 요청을 항상 먼저 배정합니다.
+    - 같은 클래스 안에서는 클라이언트별 큐를 DRR로 돌아가며 배정하므로
+      한 클라이언트의 대량 요청이 다른 클라이언트를 굶기지 않습니다.
+      비용은 요청한 이미지 수입니다.
+    - 큐가 가득 차거나 대기 시간이 초과되면 OverloadedError로 즉시 거부합니다.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        class_concurrency: Dict[str, int],
+        queue_limits: Dict[str, int],
+        queue_timeouts: Dict[str, float],
+        weights: Optional[Dict[str, float]] = None,
+        quantum: int = 1
+    ):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.class_concurrency = class_concurrency
+        self.queue_limits = queue_limits
+        self.queue_timeouts = queue_timeouts
+        self.weights = weights or {}
+        self.quantum = max(quantum, 1)
+        
+        self.total_running = 0
+        self.running = {cls: 0 for cls in PRIORITY_CLASSES}
+        self.queued = {cls: 0 for cls in PRIORITY_CLASSES}
+        # 클래스 -> (클라이언트 -> [(비용, future), ...]) 순서 유지
+        self.queues: Dict[str, "OrderedDict[str, Deque[Tuple[int, asyncio.Future]]]"] = {
+            cls: OrderedDict() for cls in PRIORITY_CLASSES
+        }
+        self.deficits: Dict[str, Dict[str, float]] = {cls: {} for cls in PRIORITY_CLASSES}
+        # 현재 DRR 몫을 사용 중인 클라이언트
+        self._current: Dict[str, Optional[str]] = {cls: None for cls in PRIORITY_CLASSES}
+
+    @classmethod
+    def from_env(cls) -> "FairScheduler":
+        """환경변수 설정으로 스케줄러 생성"""
+        return cls(
+            max_concurrency=_env_int("IMAGEN_MAX_CONCURRENCY", 4),
+            class_concurrency={
+                "interactive": _env_int("IMAGEN_INTERACTIVE_CONCURRENCY", 4),
+                "batch": _env_int("IMAGEN_BATCH_CONCURRENCY", 2)
+            },
+            queue_limits={
+                "interactive": _env_int("IMAGEN_INTERACTIVE_QUEUE_LIMIT", 32),
+                "batch": _env_int("IMAGEN_BATCH_QUEUE_LIMIT", 64)
+            },
+            queue_timeouts={
+                "interactive": _env_float("IMAGEN_INTERACTIVE_QUEUE_TIMEOUT", 30.0),
+                "batch": _env_float("IMAGEN_BATCH_QUEUE_TIMEOUT", 0.0)
+            },
+            weights=_parse_weights(os.getenv("IMAGEN_CLIENT_WEIGHTS", "")),
+            quantum=_env_int("IMAGEN_DRR_QUANTUM", 1)
+        )
+
+    def _has_capacity(self, priority: str) -> bool:
+        return (
+            self.total_running < self.max_concurrency
+            and self.running[priority] < self.class_concurrency.get(priority, self.max_concurrency)
+        )
+
+    def _start(self, priority: str) -> None:
+        self.total_running += 1
+        self.running[priority] += 1
+
+    def _release(self, priority: str) -> None:
+        self.total_running -= 1
+        self.running[priority] -= 1
+        self._dispatch()
+
+    def _pop_next(self, priority: str) -> asyncio.Future:
+        """DRR로 다음에 실행할 대기 요청 선택"""
+        clients = self.queues[priority]
+        deficits = self.deficits[priority]
+        while True:
+            client, waiters = next(iter(clients.items()))
+            cost, future = waiters[0]
+            deficit = deficits.get(client, 0)
+            if deficit < cost:
+                if self._current[priority] == client:
+                    # 이번 라운드 몫을 다 사용 → 다음 클라이언트 차례
+                    self._current[priority] = None
+                    clients.move_to_end(client)
+                    continue
+                deficit += self.quantum * self.weights.get(client, 1.0)
+                deficits[client] = deficit
+                if deficit < cost:
+                    clients.move_to_end(client)
+                    continue
+            
+            deficits[client] = deficit - cost
+            self._current[priority] = client
+            waiters.popleft()
+            self.queued[priority] -= 1
+            if not waiters:
+                del clients[client]
+                deficits.pop(client, None)
+                self._current[priority] = None
+            return future
+
+    def _dispatch(self) -> None:
+        """여유 슬롯에 대기 요청 배정 (우선순위 순)"""
+        for priority in PRIORITY_CLASSES:
+            while self.queued[priority] and self._has_capacity(priority):
+                future = self._pop_next(priority)
+                self._start(priority)
+                future.set_result(None)
+
+    def _remove(self, priority: str, client: str, future: asyncio.Future) -> None:
+        """취소되거나 시간 초과된 대기 요청 제거"""
+        waiters = self.queues[priority].get(client)
+        if not waiters:
+            return
+        for item in waiters:
+            if item[1] is future:
+                waiters.remove(item)
+                self.queued[priority] -= 1
+                break
+        if not waiters:
+            del self.queues[priority][client]
+            self.deficits[priority].pop(client, None)
+            if self._current[priority] == client:
+                self._current[priority] = None
+
+    async def acquire(self, priority: str, client: str, cost: int = 1) -> None:
+        """실행 슬롯 확보 (필요하면 공정 큐에서 대기)"""
+        # 높은 우선순위 대기 요청은 _dispatch가 먼저 배정하므로 같은 클래스만 확인
+        if self._has_capacity(priority) and not self.queued[priority]:
+            self._start(priority)
+            return
+        
+        limit = self.queue_limits.get(priority, 0)
+        if self.queued[priority] >= limit:
+            raise OverloadedError(
+                f"{priority} 대기열이 가득 찼습니다 ({self.queued[priority]}/{limit})"
+            )
+        
+        future = asyncio.get_running_loop().create_future()
+        self.queues[priority].setdefault(client, deque()).append((cost, future))
+        self.queued[priority] += 1
+        
+        timeout = self.queue_timeouts.get(priority) or None
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except BaseException as e:
+            if future.done():
+                # 대기 종료 직전에 슬롯이 배정된 경우 반납
+                self._release(priority)
+            else:
+                future.cancel()
+                self._remove(priority, client, future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise OverloadedError(
+                    f"{priority} 대기 시간 초과 ({timeout:g}초)"
+                ) from None
+            raise
+
+    @asynccontextmanager
+    async def slot(self, priority: str, client: str, cost: int = 1):
+        """실행 슬롯을 확보하고 종료 시 반납"""
+        await self.acquire(priority, client, cost)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+# 전역 스케줄러
+scheduler = FairScheduler.from_env()
+
+def resolve_priority(params: Dict[str, Any], meta: Dict[str, Any]) -> str:
+    """priority 인자 또는 _meta에서 우선순위 클래스 결정"""
+    priority = params.get("priority") or meta.get("priority") or DEFAULT_PRIORITY
+    return str(priority).lower()
+
+def resolve_client_key(meta: Dict[str, Any]) -> str:
+    """_meta에서 공정 큐의 클라이언트 키(세션/호출자 태그) 결정"""
+    for key in ("client_id", "session_id", "caller"):
+        if meta.get(key):
+            return str(meta[key])
+    return "default"
+
+class MemoryReservation:
+    """요청 하나가 예약한 이미지 메모리"""
+
+    def __init__(self, budget: "MemoryBudget", nbytes: int):
+        self.budget = budget
+        self.held = nbytes
+
+    def resize(self, nbytes: int) -> None:
+        """업스트림 응답을 받은 뒤 실제 크기로 조정"""
+        self.budget._adjust(nbytes - self.held)
+        self.held = nbytes
+
+    def release(self, nbytes: int) -> None:
+        """저장이 끝난 이미지만큼 반납"""
+        nbytes = min(nbytes, self.held)
+        self.held -= nbytes
+        self.budget._adjust(-nbytes)
+
+class MemoryBudget:
+    """프로세스 전체 이미지 메모리 예산
+
+    업스트림 호출 전에 예상 크기(이미지 수 × 이미지당 추정치)를 예약하고,
+    응답을 받으면 실제 크기(base64 + 디코딩 데이터)로 조정한 뒤 이미지를
+    저장할 때마다 반납합니다. 예산이 부족하면 다른 요청이 반납할 때까지
+    대기하므로 동시 요청이 많아도 RSS를 예측할 수 있습니다.
+    한도가 0이면 제한하지 않습니다.
+    """
+
+    def __init__(self, limit_bytes: int, image_estimate_bytes: int):
+        self.limit_bytes = limit_bytes
+        self.image_estimate_bytes = image_estimate_bytes
+        self.held = 0
+        self.peak = 0
+        self.waits = 0
+        # 우선순위 클래스별 대기 요청 (높은 클래스부터 배정)
+        self._waiters: Dict[str, Deque[Tuple[int, asyncio.Future]]] = {
+            cls: deque() for cls in PRIORITY_CLASSES
+        }
+
+    @classmethod
+    def from_env(cls) -> "MemoryBudget":
+        """환경변수 설정으로 생성 (단위: MB)"""
+        mb = 1024 * 1024
+        return cls(
+            limit_bytes=_env_int("IMAGEN_MEMORY_LIMIT_MB", 256) * mb,
+            image_estimate_bytes=_env_int("IMAGEN_IMAGE_MEMORY_ESTIMATE_MB", 8) * mb
+        )
+
+    def estimate(self, count: int) -> int:
+        """이미지 count개 생성에 필요한 예상 메모리"""
+        return count * self.image_estimate_bytes
+
+    def _fits(self, nbytes: int) -> bool:
+        # 예산보다 큰 요청도 혼자서는 실행할 수 있도록 held == 0이면 허용
+        return not self.limit_bytes or self.held == 0 or self.held + nbytes <= self.limit_bytes
+
+    def _adjust(self, delta: int) -> None:
+        self.held += delta
+        self.peak = max(self.peak, self.held)
+        if delta < 0:
+            self._wake()
+
+    def _wake(self) -> None:
+        """반납된 예산으로 대기 요청 배정 (우선순위 순, 클래스 안에서는 도착 순)"""
+        for priority in PRIORITY_CLASSES:
+            waiters = self._waiters[priority]
+            while waiters:
+                nbytes, future = waiters[0]
+                if future.done():
+                    waiters.popleft()
+                    continue
+                if not self._fits(nbytes):
+                    # 높은 우선순위 요청이 기다리는 동안 낮은 클래스가 앞지르지 않도록 중단
+                    return
+                waiters.popleft()
+                self.held += nbytes
+                self.peak = max(self.peak, self.held)
+                future.set_result(None)
+
+    def _has_waiting_before(self, priority: str) -> bool:
+        """같거나 높은 우선순위에 대기 중인 요청이 있는지"""
+        for cls in PRIORITY_CLASSES:
+            if any(not future.done() for _, future in self._waiters[cls]):
+                return True
+            if cls == priority:
+                return False
+        return False
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int, priority: str = DEFAULT_PRIORITY):
+        """메모리 예산을 예약하고 종료 시 남은 예약 반납"""
+        if not self._has_waiting_before(priority) and self._fits(nbytes):
+            self._adjust(nbytes)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[priority].append((nbytes, future))
+            self.waits += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # 대기 종료 직전에 배정된 경우 반납
+                    self._adjust(-nbytes)
+                raise
+        
+        reservation = MemoryReservation(self, nbytes)
+        try:
+            yield reservation
+        finally:
+            reservation.release(reservation.held)
+
+# 전역 메모리 예산
+memory = MemoryBudget.from_env()
+
+# 자동 선택용 모델 품질 등급 (높을수록 고품질)
+DEFAULT_MODEL = "imagegeneration@006"
+AUTO_MODEL = "auto"
+QUALITY_TIERS = ("draft", "standard", "high")
+DEFAULT_QUALITY = "standard"
+MODEL_QUALITY = {
+    "imagen-3.0-generate-002": "high",
+    "imagen-3.0-generate-001": "high",
+    "imagegeneration@006": "high",
+    "imagen-3.0-fast-generate-001": "standard",
+    "imagegeneration@005": "standard",
+    "imagegeneration@002": "draft"
+}
+
+# 과부하/일시 장애로 보는 HTTP 상태 코드
+SATURATION_STATUS_CODES = (429, 503)
+
+class ModelStats:
+    """모델별 최근 응답 시간/오류 기록"""
+
+    def __init__(self, window: int):
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self.inflight = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def latency(self) -> Optional[float]:
+        """성공한 요청의 평균 응답 시간 (기록이 없으면 None)"""
+        latencies = [elapsed for elapsed, ok in self.samples if ok]
+        if not latencies:
+            return None
+        return sum(latencies) / len(latencies)
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+class ModelSelector:
+    """응답 시간/오류율 기반 모델 자동 선택 및 대체(fallback)
+
+    - 요청한 품질 등급 이상인 모델 중 건강한 모델을 빠른 순으로 고릅니다.
+    - 연속 실패, 429/503, 높은 오류율, 성공 기록 없음 중 하나에 해당하면
+      쿨다운에 들어가 맨 뒤로 밀립니다 (다른 모델이 실패할 때의 대체 후보로만 사용).
+    - 쿨다운이 끝나면 요청 하나를 먼저 보내 확인(half-open)하고, 성공하면
+      통계를 초기화해 다시 정상 후보가 되며 실패하면 쿨다운을 다시 시작합니다.
+    - 기록이 없는 모델은 먼저 시도해 통계를 쌓습니다.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        failure_threshold: int = 3,
+        error_rate_threshold: float = 0.5,
+        cooldown: float = 60.0,
+        max_attempts: int = 2
+    ):
+        self.window = max(window, 1)
+        self.failure_threshold = max(failure_threshold, 1)
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.max_attempts = max(max_attempts, 1)
+        self.models: Dict[str, ModelStats] = {}
+
+    @classmethod
+    def from_env(cls) -> "ModelSelector":
+        """환경변수 설정으로 생성"""
+        return cls(
+            window=_env_int("IMAGEN_MODEL_STATS_WINDOW", 20),
+            failure_threshold=_env_int("IMAGEN_MODEL_FAILURE_THRESHOLD", 3),
+            error_rate_threshold=_env_float("IMAGEN_MODEL_ERROR_RATE", 0.5),
+            cooldown=_env_float("IMAGEN_MODEL_COOLDOWN", 60.0),
+            max_attempts=_env_int("IMAGEN_MODEL_MAX_ATTEMPTS", 2)
+        )
+
+    def stats_for(self, model: str) -> ModelStats:
+        if model not in self.models:
+            self.models[model] = ModelStats(self.window)
+        return self.models[model]
+
+    def state(self, model: str) -> str:
+        """모델 상태: healthy, cooldown, probe(쿨다운 종료 후 확인 대기)"""
+        stats = self.stats_for(model)
+        if not stats.cooldown_until:
+            return "healthy"
+        if stats.cooldown_until > time.monotonic():
+            return "cooldown"
+        return "probe"
+
+    def is_healthy(self, model: str) -> bool:
+        return self.state(model) == "healthy"
+
+    def candidates(self, quality: str, available: Optional[List[str]] = None) -> List[str]:
+        """품질 등급을 만족하는 모델을 선택 우선순위대로 반환"""
+        min_rank = QUALITY_TIERS.index(quality)
+        models = [
+            model for model, tier in MODEL_QUALITY.items()
+            if QUALITY_TIERS.index(tier) >= min_rank
+            and (available is None or model in available)
+        ]
+        
+        def score(model: str) -> Tuple[int, float]:
+            stats = self.stats_for(model)
+            state = self.state(model)
+            if state == "probe":
+                # 쿨다운이 끝난 모델은 확인 요청 하나만 먼저 보냄
+                return (0, 0.0) if not stats.inflight else (1, stats.error_rate())
+            if state == "cooldown":
+                return (1, stats.error_rate())
+            if not stats.samples:
+                # 기록이 전혀 없는 모델은 먼저 시도
+                return (0, 0.0)
+            latency = stats.latency()
+            if latency is None:
+                return (1, stats.error_rate())
+            # 진행 중인 요청이 많을수록 불리
+            return (0, latency * (1 + stats.inflight))
+        
+        return sorted(models, key=score)
+
+    def start(self, model: str) -> float:
+        self.stats_for(model).inflight += 1
+        return time.monotonic()
+
+    def record_success(self, model: str, started: float) -> None:
+        stats = self.stats_for(model)
+        stats.inflight -= 1
+        if stats.cooldown_until:
+            # 확인 요청(또는 대체 요청) 성공 → 장애 이전 통계를 버리고 정상 복귀
+            stats.samples.clear()
+            stats.cooldown_until = 0.0
+        stats.samples.append((time.monotonic() - started, True))
+        stats.consecutive_failures = 0
+
+    def record_failure(self, model: str, started: float, error: Exception) -> None:
+        stats = self.stats_for(model)
+        stats.inflight -= 1
+        stats.samples.append((time.monotonic() - started, False))
+        stats.consecutive_failures += 1
+        saturated = getattr(error, "status_code", None) in SATURATION_STATUS_CODES
+        high_error_rate = (
+            len(stats.samples) >= max(self.window // 2, 1)
+            and stats.error_rate() >= self.error_rate_threshold
+        )
+        if (
+            saturated
+            or stats.consecutive_failures >= self.failure_threshold
+            or high_error_rate
+            or stats.latency() is None
+            or stats.cooldown_until
+        ):
+            stats.cooldown_until = time.monotonic() + self.cooldown
+
+    def cancel(self, model: str) -> None:
+        self.stats_for(model).inflight -= 1
+
+# 전역 모델 선택기
+model_selector = ModelSelector.from_env()
+
+def is_upstream_failure(error: Exception) -> bool:
+    """모델 상태에 반영하고 다른 모델로 대체할 오류인지 확인
+
+    5xx, 429, 시간 초과, 연결 오류만 해당합니다. 4xx나 안전 필터로 이미지가
+    생성되지 않은 경우처럼 요청 자체의 문제는 다른 모델로 재시도하지 않습니다.
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    # 클라이언트가 requests 예외(OSError 하위)를 APIError로 감싸서 전달
+    cause = error.__cause__ or error.__context__
+    return any(isinstance(e, (OSError, asyncio.TimeoutError)) for e in (error, cause))
+
+async def generate_with_model(
+    kwargs: Dict[str, Any],
+    quality: str,
+    available: Optional[List[str]] = None
+) -> Tuple[Any, str]:
+    """모델 통계를 기록하며 이미지 생성 (auto면 실패 시 다른 모델로 대체)
+
+    Returns:
+        (생성 결과, 실제 사용한 모델)
+    """
+    if kwargs["model"] == AUTO_MODEL:
+        models = model_selector.candidates(quality, available)[:model_selector.max_attempts]
+    else:
+        models = [kwargs["model"]]
+    
+    if not models:
+        raise ValueError(f"품질 등급 {quality}을(를) 만족하는 사용 가능한 모델이 없습니다.")
+    
+    last_error: Optional[Exception] = None
+    for model in models:
+        started = model_selector.start(model)
+        try:
+            result = await imagen_client.generate(**dict(kwargs, model=model))
+        except asyncio.CancelledError:
+            model_selector.cancel(model)
+            raise
+        except Exception as e:
+            if not is_upstream_failure(e):
+                # 입력/인증/안전 필터 오류는 모델 상태와 무관
+                model_selector.cancel(model)
+                raise
+            model_selector.record_failure(model, started, e)
+            last_error = e
+            continue
+        model_selector.record_success(model, started)
+        return result, model
+    
+    raise last_error
+
+class ModelCatalog:
+    """모델 목록 캐시 (TTL + stale-while-revalidate)
+
+    TTL이 지나면 기존 목록을 그대로 반환하면서 백그라운드에서 갱신합니다.
+    cache_file을 지정하면 재시작 후에도 마지막 목록을 바로 사용합니다.
+    """
+
+    def __init__(self, ttl: float, cache_file: Optional[str] = None):
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.models: Optional[List[str]] = None
+        self.text: Optional[str] = None
+        self.fetched_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "ModelCatalog":
+        """환경변수 설정으로 생성"""
+        return cls(
+            ttl=_env_float("IMAGEN_MODEL_CACHE_TTL", 300.0),
+            cache_file=os.getenv("IMAGEN_MODEL_CACHE_FILE") or None
+        )
+
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at > self.ttl
+
+    def _set(self, models: List[str], fetched_at: float) -> None:
+        self.models = models
+        self.fetched_at = fetched_at
+        model_list = "\n".join([f"• {model}" for model in models])
+        self.text = f"🤖 사용 가능한 Imagen 모델:\n\n{model_list}"
+
+    def _load_file(self) -> None:
+        """디스크 캐시 읽기 (없거나 손상되면 무시)"""
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._set(list(data["models"]), float(data["fetched_at"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save_file(self) -> None:
+        """디스크 캐시 쓰기 (실패해도 무시)"""
+        if not self.cache_file:
+            return
+        tmp_path = None
+        try:
+            # 여러 프로세스가 동시에 써도 겹치지 않도록 고유한 임시 파일 사용
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(self.cache_file)), suffix=".tmp"
+            )
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"models": self.models, "fetched_at": self.fetched_at}, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.error(f"모델 목록 캐시 저장 실패: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def refresh(self) -> None:
+        """업스트림에서 모델 목록 다시 가져오기"""
+        loop = asyncio.get_running_loop()
+        models = await loop.run_in_executor(None, imagen_client.list_models)
+        self._set(list(models), time.time())
+        self._save_file()
+
+    def _on_refresh_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            logger.error(f"모델 목록 갱신 실패: {task.exception()}")
+
+    def _start_refresh(self) -> asyncio.Task:
+        """갱신 작업 시작 (이미 진행 중이면 그 작업 공유)"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+            self._refresh_task.add_done_callback(self._on_refresh_done)
+        return self._refresh_task
+
+    async def get(self) -> List[str]:
+        """모델 목록 반환 (만료된 경우 기존 목록 반환 후 백그라운드 갱신)"""
+        if self.models is None:
+            self._load_file()
+        if self.models is None:
+            await asyncio.shield(self._start_refresh())
+        elif self.is_stale():
+            self._start_refresh()
+        return self.models
+
+    async def get_text(self) -> str:
+        """list_models 응답용 포맷된 목록"""
+        await self.get()
+        return self.text
+
+# 전역 모델 목록 캐시
+model_catalog = ModelCatalog.from_env()
+
 async def initialize_client():
     """ImagenClient 초기화"""
     global imagen_client
@@ -61,8 +711,64 @@ async def initialize_client():
             # 인증 실패 시 조용히 처리
             pass
 
-async def handle_generate_image(params: Dict[str, Any]) -> Dict[str, Any]:
+def decoded_size(base64_data: str) -> int:
+    """base64 문자열을 디코딩하지 않고 원본 바이트 수 계산"""
+    padding = len(base64_data) - len(base64_data.rstrip("="))
+    return len(base64_data) * 3 // 4 - padding
+
+def image_memory(image: Any) -> int:
+    """이미지 하나가 저장 시점에 차지하는 메모리 (base64 + 디코딩 데이터)"""
+    return len(image.base64_data) + decoded_size(image.base64_data)
+
+def save_images(images: List[Any], params: Dict[str, Any], reservation: MemoryReservation) -> Tuple[List[int], List[str]]:
+    """이미지 저장 처리 (저장한 이미지는 바로 놓아주고 메모리 예약 반납)
+
+    Returns:
+        (이미지별 크기, 저장된 파일 경로)
+    """
+    save_path = params.get("save_path")
+    if save_path:
+        os.makedirs(save_path, exist_ok=True)
+    
+    # filename이 지정된 경우 정확한 파일명 사용, 아니면 타임스탬프 추가
+    custom_filename = params.get("filename")
+    if custom_filename and not custom_filename.endswith(('.png', '.jpg', '.jpeg')):
+        # 확장자가 없으면 .png 추가
+        custom_filename += '.png'
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename_prefix = params.get("filename_prefix", "generated_image")
+    
+    total = len(images)
+    image_sizes = []
+    saved_files = []
+    for i in range(total):
+        image = images.pop(0)
+        image_sizes.append(decoded_size(image.base64_data))
+        
+        if save_path:
+            if custom_filename and total == 1:
+                # 이미지가 1개면 그대로 사용
+                filename = custom_filename
+            elif custom_filename:
+                # 여러 개면 숫자 추가
+                name, ext = os.path.splitext(custom_filename)
+                filename = f"{name}_{i+1}{ext}"
+            else:
+                # 기존 방식: 타임스탬프 사용
+                filename = f"{filename_prefix}_{timestamp}_{i+1}.png"
+            
+            filepath = os.path.join(save_path, filename)
+            image.save(filepath)
+            saved_files.append(filepath)
+        
+        reservation.release(image_memory(image))
+        del image
+    
+    return image_sizes, saved_files
+
+async def handle_generate_image(params: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """이미지 생성 처리"""
+    meta = meta or {}
     try:
         # 클라이언트 초기화 확인
         global imagen_client
@@ -81,11 +787,22 @@ async def handle_generate_image(params: Dict[str, Any]) -> Dict[str, Any]:
                 ]
             }
         
+        count = params.get("count", 1)
+        if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+            return {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"❌ 오류: count는 1 이상의 정수여야 합니다: {count}"
+                    }
+                ]
+            }
+        
         kwargs = {
             "prompt": prompt,
-            "count": min(params.get("count", 1), 4),
+            "count": min(count, 4),
             "aspect_ratio": params.get("aspect_ratio", "1:1"),
-            "model": params.get("model", "imagegeneration@006"),
+            "model": params.get("model", DEFAULT_MODEL),
             "safety_setting": params.get("safety_setting", "block_some")
         }
         
@@ -95,56 +812,64 @@ async def handle_generate_image(params: Dict[str, Any]) -> Dict[str, Any]:
         if params.get("seed") is not None:
             kwargs["seed"] = params["seed"]
         
-        # 이미지 생성
-        result = await imagen_client.generate(**kwargs)
+        # 캐시된 모델 목록으로 업스트림 호출 전에 모델 검증
+        available = await model_catalog.get()
+        if kwargs["model"] != AUTO_MODEL and kwargs["model"] not in available:
+            return {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"❌ 오류: 지원되지 않는 모델입니다: {kwargs['model']} (list_models로 사용 가능한 모델을 확인하세요)"
+                    }
+                ]
+            }
         
-        # 결과 처리
-        if isinstance(result, list):
-            images = result
-        else:
-            images = [result]
+        priority = resolve_priority(params, meta)
+        if priority not in PRIORITY_CLASSES:
+            return {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"❌ 오류: 지원되지 않는 priority입니다: {priority} (사용 가능: {', '.join(PRIORITY_CLASSES)})"
+                    }
+                ]
+            }
         
-        # 저장 처리
-        saved_files = []
-        save_path = params.get("save_path")
-        if save_path:
-            os.makedirs(save_path, exist_ok=True)
+        quality = params.get("quality", DEFAULT_QUALITY)
+        if quality not in QUALITY_TIERS:
+            return {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"❌ 오류: 지원되지 않는 quality입니다: {quality} (사용 가능: {', '.join(QUALITY_TIERS)})"
+                    }
+                ]
+            }
+        
+        # 이미지 생성 (우선순위/공정 큐 → 메모리 예산 순으로 확보 후 실행)
+        async with scheduler.slot(priority, resolve_client_key(meta), kwargs["count"]), \
+                memory.reserve(memory.estimate(kwargs["count"]), priority) as reservation:
+            result, used_model = await generate_with_model(kwargs, quality, available)
             
-            # filename이 지정된 경우 정확한 파일명 사용, 아니면 타임스탬프 추가
-            custom_filename = params.get("filename")
-            if custom_filename:
-                # 확장자가 없으면 .png 추가
-                if not custom_filename.endswith(('.png', '.jpg', '.jpeg')):
-                    custom_filename += '.png'
-                    
-                for i, image in enumerate(images):
-                    if len(images) == 1:
-                        # 이미지가 1개면 그대로 사용
-                        filename = custom_filename
-                    else:
-                        # 여러 개면 숫자 추가
-                        name, ext = os.path.splitext(custom_filename)
-                        filename = f"{name}_{i+1}{ext}"
-                    
-                    filepath = os.path.join(save_path, filename)
-                    image.save(filepath)
-                    saved_files.append(filepath)
+            # 결과 처리
+            if isinstance(result, list):
+                images = result
             else:
-                # 기존 방식: 타임스탬프 사용
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename_prefix = params.get("filename_prefix", "generated_image")
-                
-                for i, image in enumerate(images):
-                    filename = f"{filename_prefix}_{timestamp}_{i+1}.png"
-                    filepath = os.path.join(save_path, filename)
-                    image.save(filepath)
-                    saved_files.append(filepath)
+                images = [result]
+            del result
+            
+            # 실제 보유 크기로 예약 조정 (디코딩은 저장할 때 한 장씩)
+            reservation.resize(sum(image_memory(image) for image in images))
+            image_sizes, saved_files = save_images(images, params, reservation)
         
         # 결과 구성
-        result_text = f"✅ {len(images)}개 이미지 생성 완료!\n\n"
+        result_text = f"✅ {len(image_sizes)}개 이미지 생성 완료!\n\n"
         
-        for i, image in enumerate(images):
-            result_text += f"🎨 이미지 {i+1}: {image.size:,} bytes\n"
+        for i, size in enumerate(image_sizes):
+            result_text += f"🎨 이미지 {i+1}: {size:,} bytes\n"
+        
+        if kwargs["model"] == AUTO_MODEL:
+            result_text += f"\n🤖 자동 선택된 모델: {used_model}\n"
         
         if saved_files:
             result_text += f"\n📁 저장된 파일들:\n"
@@ -158,6 +883,15 @@ async def handle_generate_image(params: Dict[str, Any]) -> Dict[str, Any]:
         
         return {"content": response_content}
         
+    except OverloadedError as e:
+        return {
+            "content": [
+                {
+                    "type": "text",
+                    "text": f"❌ 서버 과부하(overloaded): {str(e)}. 잠시 후 다시 시도해주세요."
+                }
+            ]
+        }
     except Exception as e:
         return {
             "content": [
@@ -175,9 +909,7 @@ async def handle_list_models() -> Dict[str, Any]:
         if not imagen_client:
             await initialize_client()
         
-        models = imagen_client.list_models()
-        model_list = "\n".join([f"• {model}" for model in models])
-        result_text = f"🤖 사용 가능한 Imagen 모델:\n\n{model_list}"
+        result_text = await model_catalog.get_text()
         
         return {"content": [{"type": "text", "text": result_text}]}
         
@@ -252,8 +984,14 @@ async def handle_message(message: Dict[str, Any]) -> Dict[str, Any]:
                                     },
                                     "model": {
                                         "type": "string",
-                                        "default": "imagegeneration@006",
-                                        "description": "사용할 Imagen 모델"
+                                        "default": DEFAULT_MODEL,
+                                        "description": "사용할 Imagen 모델 (\"auto\"면 응답 시간/오류율 기반 자동 선택 및 대체)"
+                                    },
+                                    "quality": {
+                                        "type": "string",
+                                        "enum": list(QUALITY_TIERS),
+                                        "default": DEFAULT_QUALITY,
+                                        "description": "model이 auto일 때 요구하는 최소 품질 등급"
                                     },
                                     "seed": {
                                         "type": "integer",
@@ -276,6 +1014,12 @@ async def handle_message(message: Dict[str, Any]) -> Dict[str, Any]:
                                         "type": "string",
                                         "default": "generated_image",
                                         "description": "파일명 접두사 (filename이 없을 때만 사용)"
+                                    },
+                                    "priority": {
+                                        "type": "string",
+                                        "enum": list(PRIORITY_CLASSES),
+                                        "default": DEFAULT_PRIORITY,
+                                        "description": "요청 우선순위 (대량 작업은 batch 사용)"
                                     }
                                 },
                                 "required": ["prompt"]
@@ -298,7 +1042,7 @@ async def handle_message(message: Dict[str, Any]) -> Dict[str, Any]:
             tool_args = params.get("arguments", {})
             
             if tool_name == "generate_image":
-                result = await handle_generate_image(tool_args)
+                result = await handle_generate_image(tool_args, params.get("_meta") or {})
             elif tool_name == "list_models":
                 result = await handle_list_models()
             else:
@@ -331,8 +1075,27 @@ async def handle_message(message: Dict[str, Any]) -> Dict[str, Any]:
             "error": {"code": -32603, "message": f"내부 오류: {str(e)}"}
         }
 
+async def process_line(line: str):
+    """메시지 한 줄 처리 후 응답 출력"""
+    try:
+        message = json.loads(line)
+    except json.JSONDecodeError:
+        # JSON 오류는 무시
+        return
+    
+    try:
+        response = await handle_message(message)
+        
+        # 응답이 있는 경우만 출력 (notifications는 None 반환)
+        if response is not None:
+            print(json.dumps(response), flush=True)
+    except Exception:
+        pass
+
 async def stdio_server():
     """STDIO MCP 서버"""
+    # 요청을 동시에 처리해야 스케줄러가 우선순위/공정성을 적용할 수 있음
+    pending = set()
     try:
         while True:
             # 표준 입력에서 메시지 읽기
@@ -344,17 +1107,13 @@ async def stdio_server():
             if not line:
                 continue
             
-            try:
-                message = json.loads(line)
-                response = await handle_message(message)
-                
-                # 응답이 있는 경우만 출력 (notifications는 None 반환)
-                if response is not None:
-                    print(json.dumps(response), flush=True)
-                
-            except json.JSONDecodeError:
-                # JSON 오류는 무시
-                continue
+            task = asyncio.create_task(process_line(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        
+        # 입력 종료 시 처리 중인 요청 마무리
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
                 
     except KeyboardInterrupt:
         pass
@@ -400,8 +1159,228 @@ async def interactive_mode():
     except Exception as e:
         print(f"초기화 실패: {e}", file=sys.stderr)
 
+# 대체 백엔드가 반환하는 1x1 PNG
+STUB_IMAGE_BASE64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+class StubImagenClient:
+    """부하 테스트용 대체 백엔드 (고정 지연 후 작은 이미지 반환)"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def list_models(self) -> List[str]:
+        return list(MODEL_QUALITY)
+
+    async def generate(self, prompt: str, *, count: int = 1, **kwargs) -> Any:
+        await asyncio.sleep(self.latency)
+        images = [GeneratedImage(STUB_IMAGE_BASE64, prompt) for _ in range(count)]
+        return images[0] if count == 1 else images
+
+def read_load_test_jobs(path: str) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """JSONL 프롬프트 읽기
+
+    각 줄은 generate_image 인자 객체(선택적으로 "_meta" 포함) 또는 프롬프트 문자열입니다.
+    JSON이 아닌 줄은 프롬프트 텍스트로 취급합니다.
+    """
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    
+    jobs = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            item = line
+        if isinstance(item, str):
+            item = {"prompt": item}
+        if not isinstance(item, dict):
+            continue
+        meta = item.pop("_meta", None) or {}
+        jobs.append((item, meta))
+    return jobs
+
+def classify_result(text: str) -> str:
+    """handle_generate_image 응답을 ok/overloaded/error로 분류"""
+    if text.startswith("✅"):
+        return "ok"
+    if "(overloaded)" in text:
+        return "overloaded"
+    return "error"
+
+def resolve_used_model(text: str, params: Dict[str, Any]) -> str:
+    """실제 사용한 모델 (auto면 응답의 자동 선택 모델)"""
+    match = re.search(r"자동 선택된 모델: (\S+)", text)
+    if match:
+        return match.group(1)
+    return params.get("model", DEFAULT_MODEL)
+
+def percentile(values: List[float], pct: float) -> float:
+    """nearest-rank 백분위수 (값이 없으면 0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+async def load_test(args: argparse.Namespace):
+    """부하/소크 테스트 모드
+
+    handle_generate_image 경로를 그대로 사용해 여러 요청을 동시에 실행하고
+    처리량/지연 시간/오류 요약과 요청별 CSV를 출력합니다.
+    """
+    global imagen_client
+    
+    try:
+        jobs = read_load_test_jobs(args.input)
+    except OSError as e:
+        print(f"❌ 입력 파일을 읽을 수 없습니다: {e}", file=sys.stderr)
+        return
+    if not jobs:
+        print("❌ 실행할 프롬프트가 없습니다.", file=sys.stderr)
+        return
+    
+    if args.stub_latency is not None:
+        imagen_client = StubImagenClient(args.stub_latency)
+    else:
+        try:
+            await initialize_client()
+        except Exception as e:
+            print(f"초기화 실패: {e}", file=sys.stderr)
+            return
+    
+    concurrency = max(args.concurrency, 1)
+    print(
+        f"🚀 부하 테스트 시작: 프롬프트 {len(jobs)}개, 동시 실행 {concurrency}"
+        + (f", {args.duration:g}초 동안 반복" if args.duration > 0 else ""),
+        file=sys.stderr
+    )
+    
+    records: List[Dict[str, Any]] = []
+    counter = itertools.count()
+    started = time.monotonic()
+    deadline = started + args.duration if args.duration > 0 else None
+    
+    def next_job() -> Optional[Tuple[int, Tuple[Dict[str, Any], Dict[str, Any]]]]:
+        index = next(counter)
+        if deadline is None:
+            return (index, jobs[index]) if index < len(jobs) else None
+        if time.monotonic() >= deadline:
+            return None
+        return index, jobs[index % len(jobs)]
+    
+    async def worker():
+        while True:
+            job = next_job()
+            if job is None:
+                return
+            index, (params, meta) = job
+            request_started = time.monotonic()
+            result = await handle_generate_image(params, meta)
+            latency = time.monotonic() - request_started
+            text = result["content"][0]["text"]
+            records.append({
+                "index": index,
+                "started_at": round(request_started - started, 3),
+                "latency_ms": round(latency * 1000, 1),
+                "status": classify_result(text),
+                "priority": resolve_priority(params, meta),
+                "model": resolve_used_model(text, params),
+                "count": params.get("count", 1),
+                "prompt": params.get("prompt", ""),
+                "message": text.splitlines()[0] if text else ""
+            })
+    
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.monotonic() - started
+    
+    records.sort(key=lambda record: record["index"])
+    
+    statuses = {status: 0 for status in ("ok", "overloaded", "error")}
+    for record in records:
+        statuses[record["status"]] += 1
+    ok_latencies = [record["latency_ms"] for record in records if record["status"] == "ok"]
+    throughput = statuses["ok"] / elapsed if elapsed > 0 else 0.0
+    
+    summary = (
+        f"📊 부하 테스트 결과\n"
+        f"  요청: {len(records)} (성공 {statuses['ok']}, 과부하 {statuses['overloaded']}, 오류 {statuses['error']})\n"
+        f"  소요 시간: {elapsed:.2f}초, 처리량: {throughput:.2f} req/s\n"
+        f"  성공 지연 시간(ms): p50 {percentile(ok_latencies, 50):.1f}, "
+        f"p95 {percentile(ok_latencies, 95):.1f}, p99 {percentile(ok_latencies, 99):.1f}, "
+        f"max {max(ok_latencies, default=0.0):.1f}\n"
+    )
+    for priority in PRIORITY_CLASSES:
+        priority_records = [record for record in records if record["priority"] == priority]
+        if not priority_records:
+            continue
+        latencies = [record["latency_ms"] for record in priority_records if record["status"] == "ok"]
+        summary += (
+            f"  {priority} 성공 지연 시간(ms): p50 {percentile(latencies, 50):.1f}, "
+            f"p95 {percentile(latencies, 95):.1f} (성공 {len(latencies)}/{len(priority_records)})\n"
+        )
+    summary += (
+        f"  이미지 메모리 예약: peak {memory.peak:,} bytes, 예산 대기 {memory.waits}회"
+    )
+    print(summary)
+    
+    # 요약을 먼저 출력해 CSV 저장에 실패해도 결과가 남도록 함
+    if args.csv:
+        try:
+            with open(args.csv, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(records[0].keys()) if records else ["index"])
+                writer.writeheader()
+                writer.writerows(records)
+        except OSError as e:
+            print(f"❌ CSV 파일을 저장할 수 없습니다: {e}", file=sys.stderr)
+            return
+        print(f"  📎 요청별 결과: {args.csv}")
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """loadtest 서브커맨드 인자 처리"""
+    parser = argparse.ArgumentParser(description="Vertex AI Imagen MCP Server")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    load_test_parser = subparsers.add_parser(
+        "loadtest",
+        help="JSONL 프롬프트로 부하/소크 테스트 실행"
+    )
+    load_test_parser.add_argument(
+        "input", nargs="?", default="-",
+        help="JSONL 프롬프트 파일 (기본값: - 표준 입력)"
+    )
+    load_test_parser.add_argument(
+        "-c", "--concurrency", type=int, default=4,
+        help="동시 실행 요청 수 (기본값: 4)"
+    )
+    load_test_parser.add_argument(
+        "-d", "--duration", type=float, default=0,
+        help="지정한 시간(초) 동안 프롬프트를 반복 실행 (기본값: 0, 각 프롬프트 1회)"
+    )
+    load_test_parser.add_argument(
+        "--csv",
+        help="요청별 결과를 저장할 CSV 파일 경로"
+    )
+    load_test_parser.add_argument(
+        "--stub-latency", type=float,
+        help="실제 API 대신 지정한 지연 시간(초)의 대체 백엔드 사용"
+    )
+    return parser.parse_args(argv)
+
 async def main():
     """메인 함수"""
+    # 서브커맨드가 있을 때만 인자 처리 (MCP/대화형 모드는 기존처럼 인자 무시)
+    if len(sys.argv) > 1 and sys.argv[1] == "loadtest":
+        await load_test(parse_args(sys.argv[1:]))
+        return
+    
     # 표준 입력이 터미널인지 확인
     if sys.stdin.isatty():
         # 대화형 모드